@@ -3,10 +3,11 @@ Lily Core Controller
 Handles messages received from Lily-Core
 """
 
-import json
 import logging
 import asyncio
-from typing import Dict
+from typing import Any, Dict, Union
+
+from orjson import JSONDecodeError, loads as json_loads
 
 from services.session_service import SessionService
 
@@ -25,36 +26,33 @@ class LilyCoreController:
         """
         self.session_service = session_service
         self._user_sessions = {}  # Track channel for responses
+        
+        # Message type -> handler, resolved once instead of per message
+        self._handlers = {
+            "response": self._handle_response,
+            "session_start": self._handle_session_start,
+            "session_end": self._handle_session_end,
+            "session_no_active": self._handle_session_no_active,
+            "session_expired": self._handle_session_expired,
+        }
     
-    async def handle_message(self, message: str, lily_core_available: bool = None):
+    async def handle_message(self, message: Union[str, Dict[str, Any]], lily_core_available: bool = None):
         """
         Handle incoming messages from Lily-Core.
         
         Args:
-            message: Raw message string from Lily-Core
+            message: Decoded message dict from Lily-Core (a raw JSON string is parsed first)
             lily_core_available: Whether Lily-Core is available (for logging)
         """
         try:
-            data = json.loads(message)
+            data = message if isinstance(message, dict) else json_loads(message)
             logger.info(f"Received from lily-core: {data}")
             
-            # Extract relevant information
-            response_type = data.get("type", "")
-            user_id = data.get("user_id")
-            text = data.get("text", "")
-            
-            if response_type == "response":
-                await self._handle_response(user_id, text)
-            elif response_type == "session_start":
-                await self._handle_session_start(user_id, text)
-            elif response_type == "session_end":
-                await self._handle_session_end(user_id, text)
-            elif response_type == "session_no_active":
-                await self._handle_session_no_active(user_id, text)
-            elif response_type == "session_expired":
-                await self._handle_session_expired(user_id)
+            handler = self._handlers.get(data.get("type", ""))
+            if handler:
+                await handler(data.get("user_id"), data.get("text", ""))
                 
-        except json.JSONDecodeError:
+        except JSONDecodeError:
             logger.error(f"Invalid JSON from lily-core: {message}")
         except Exception as e:
             logger.error(f"Error handling lily-core message: {e}")
@@ -63,7 +61,7 @@ class LilyCoreController:
         """Handle regular chat response"""
         channel = self.get_channel_for_user(user_id)
         if channel:
-            await channel.send(f"{text}")
+            await channel.send(text)
     
     async def _handle_session_start(self, user_id: str, text: str):
         """Handle session start response (greeting from LLM)"""
@@ -73,7 +71,7 @@ class LilyCoreController:
             session = self.session_service.get_session(user_id)
             if session:
                 session.start_session()
-            await channel.send(f"{text}")
+            await channel.send(text)
     
     async def _handle_session_end(self, user_id: str, text: str):
         """Handle session end response (farewell from LLM)"""
@@ -81,15 +79,15 @@ class LilyCoreController:
         if channel:
             # End active session locally
             self.session_service.end_session(user_id)
-            await channel.send(f"{text}")
+            await channel.send(text)
     
     async def _handle_session_no_active(self, user_id: str, text: str):
         """Handle when user says goodbye but no active session"""
         channel = self.get_channel_for_user(user_id)
         if channel:
-            await channel.send(f"{text}")
+            await channel.send(text)
 
-    async def _handle_session_expired(self, user_id: str):
+    async def _handle_session_expired(self, user_id: str, text: str = ""):
         """Handle session expired event from Core"""
         # Close local session
         self.session_service.end_session(user_id)
@@ -3,8 +3,8 @@ Message Controller
 Handles Discord message events with concurrency support
 """
 
+import asyncio
 import logging
-import json
 from typing import Dict, Optional
 
 import discord
@@ -43,6 +43,10 @@ class MessageController:
         self.concurrency_manager = concurrency_manager
         self.user_rate_limiter = user_rate_limiter
         self._user_sessions = {}  # Track channel for responses
+        self._notices = set()  # In-flight eviction notices
+        
+        # Tell users when their session is dropped to make room for others
+        session_service.on_evict = self._on_session_evicted
         
         # Register event handler
         bot.event(self.on_message)
@@ -108,8 +112,7 @@ class MessageController:
                 "user_id": user_id,
                 "username": username,
                 "text": actual_message,
-                "channel": channel,
-                "attachments": []
+                "channel": channel
             }
             success = await self.concurrency_manager.submit_message(message_data)
             if not success:
@@ -136,8 +139,7 @@ class MessageController:
                     "user_id": user_id,
                     "username": username,
                     "text": content,
-                    "channel": channel,
-                    "attachments": []
+                    "channel": channel
                 }
                 success = await self.concurrency_manager.submit_message(message_data)
                 if not success:
@@ -158,24 +160,13 @@ class MessageController:
         # Update channel for response
         self._user_sessions[user_id] = channel
         
-        # Handle voice messages if any
-        attachments = []
-        for attachment in message.attachments:
-            if attachment.filename.endswith(('.wav', '.mp3', '.m4a', '.flac', '.ogg')):
-                attachments.append({
-                    "type": "audio",
-                    "url": attachment.url,
-                    "filename": attachment.filename
-                })
-        
         # If concurrency manager is available, use it for message processing
         if self.concurrency_manager:
             message_data = {
                 "user_id": user_id,
                 "username": username,
                 "text": content,
-                "channel": channel,
-                "attachments": attachments
+                "channel": channel
             }
             success = await self.concurrency_manager.submit_message(message_data)
             if not success:
@@ -183,12 +174,31 @@ class MessageController:
                 logger.warning(f"Message dropped for user {username} due to queue overflow")
         else:
             # Direct processing without queue
-            response_text = await self.lily_core_service.send_chat_message(user_id, username, content, attachments)
+            response_text = await self.lily_core_service.send_chat_message(user_id, username, content)
             if response_text:
                 await send_message(channel, response_text, prefix="")
         
         logger.info(f"User {username} ({user_id}): {content}")
     
+    def _on_session_evicted(self, session):
+        """Schedule a notice for a user whose session was evicted"""
+        self._user_sessions.pop(session.user_id, None)
+        if session.channel is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._send_eviction_notice(session))
+        self._notices.add(task)
+        task.add_done_callback(self._notices.discard)
+    
+    async def _send_eviction_notice(self, session):
+        """Let the user know their conversation was closed"""
+        try:
+            await session.channel.send(
+                "Our conversation was closed because I'm talking with a lot of people right now. "
+                "Say **'Hey Lily'** to start a new one."
+            )
+        except Exception as e:
+            logger.error(f"Failed to notify {session.username} of session eviction: {e}")
+    
     def get_channel_for_user(self, user_id: str):
         """Get the channel for a user's session"""
         return self._user_sessions.get(user_id)
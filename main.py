@@ -9,8 +9,6 @@ import sys
 import asyncio
 import time
 import logging
-import json
-from datetime import datetime
 
 import discord
 from discord.ext import commands
@@ -61,27 +59,31 @@ user_rate_limiter = None
 BOT = None
 
 
-def get_lily_core_http_url():
-    """Get Lily-Core HTTP URL from Consul."""
+async def get_lily_core_http_url():
+    """Get Lily-Core HTTP URL from Consul (cached by ServiceDiscovery)."""
     if sd:
-        return sd.get_service_url("lily-core", "http")
+        return await sd.get_service_url("lily-core", "http")
     return None
 
 
+def invalidate_lily_core_http_url():
+    """Drop the cached Lily-Core lookup so the next one goes to Consul."""
+    if sd:
+        sd.invalidate("lily-core")
+
+
 async def process_message_task(message_data: dict):
     """Worker task to process messages from queue"""
     user_id = message_data.get("user_id")
     content = message_data.get("text")
     username = message_data.get("username")
     channel = message_data.get("channel")
-    attachments = message_data.get("attachments", [])
     
     # Send message to Lily-Core via HTTP (service handles message creation)
     response_text = await lily_core_service.send_chat_message(
         user_id=user_id,
         username=username,
-        text=content,
-        attachments=attachments
+        text=content
     )
     
     if response_text:
@@ -99,7 +101,7 @@ async def initialize_services():
     # Register with Consul for service discovery
     port = int(os.getenv("PORT", "8004"))
     sd = ServiceDiscovery(service_name="lily-discord-adapter", port=port, tags=["discord", "adapter"])
-    sd.start()
+    await sd.start()
     
     # Configure rate limiting
     rate_config = RateLimitConfig(
@@ -135,7 +137,7 @@ async def initialize_services():
         logger.info(f"lily-core HTTP URL: {http_url}")
         # Fetch WS URL as well
         if sd:
-            ws_url = sd.get_service_url("lily-core", "ws")
+            ws_url = await sd.get_service_url("lily-core", "ws")
             logger.info(f"lily-core WS URL: {ws_url}")
     else:
         lily_core_available = False
@@ -263,7 +265,10 @@ async def readiness_check():
 def run_health_server():
     """Run the health check server on a separate thread"""
     port = int(os.getenv("PORT", "8004"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Single worker on purpose: the endpoints read live bot state from this process.
+    # Access logging is off so Consul/Docker health probes don't spam the log.
+    access_log = os.getenv("HEALTH_ACCESS_LOG", "false").lower() == "true"
+    uvicorn.run(app, host="0.0.0.0", port=port, access_log=access_log)
 
 
 async def monitor_lily_core():
@@ -283,10 +288,11 @@ async def monitor_lily_core():
                     http_url = None
                     ws_url = None
                     if is_available and sd:
-                        http_url = sd.get_service_url("lily-core", "http")
-                        ws_url = sd.get_service_url("lily-core", "ws")
+                        http_url = await sd.get_service_url("lily-core", "http")
+                        ws_url = await sd.get_service_url("lily-core", "ws")
                         logger.info(f"lily-core discovered/connected at: {http_url} (WS: {ws_url})")
                     else:
+                        invalidate_lily_core_http_url()
                         logger.warning("lily-core lost connection or not found.")
                         
                     bot_service.set_lily_core_status(is_available, http_url, ws_url)
@@ -307,6 +313,10 @@ async def shutdown():
         session_service._sessions.clear()
     if lily_core_service:
         await lily_core_service.close()
+    if music_service:
+        await music_service.close()
+    if sd:
+        await sd.close()
     if BOT and not BOT.is_closed():
         await BOT.close()
 
@@ -321,71 +331,74 @@ async def main():
     # Get the current event loop
     loop = asyncio.get_running_loop()
     
-    # Initialize services
-    await initialize_services()
+    try:
+        # Initialize services
+        await initialize_services()
     
-    # Start background monitoring
-    asyncio.create_task(monitor_lily_core())
+        # Start background monitoring
+        asyncio.create_task(monitor_lily_core())
     
-    # Initialize bot controller references with the loop (no bot yet)
-    bot_service.set_bot_references(None, bot_enabled, bot_startup_attempted, loop)
+        # Initialize bot controller references with the loop (no bot yet)
+        bot_service.set_bot_references(None, bot_enabled, bot_startup_attempted, loop)
     
-    # Start health check server in a separate thread
-    import threading
-    health_thread = threading.Thread(target=run_health_server, daemon=True)
-    health_thread.start()
+        # Start health check server in a separate thread
+        import threading
+        health_thread = threading.Thread(target=run_health_server, daemon=True)
+        health_thread.start()
     
-    if not bot_token:
-        logger.warning("DISCORD_BOT_TOKEN not set - Discord bot features disabled")
-        bot_enabled = False
-        bot_service.set_bot_references(None, bot_enabled, bot_startup_attempted, loop)
-        logger.info("Lily-Discord-Adapter running in HTTP mode (health endpoints active)")
-        # Keep the HTTP server running - Discord features are disabled
-        while True:
-            await asyncio.sleep(3600)
+        if not bot_token:
+            logger.warning("DISCORD_BOT_TOKEN not set - Discord bot features disabled")
+            bot_enabled = False
+            bot_service.set_bot_references(None, bot_enabled, bot_startup_attempted, loop)
+            logger.info("Lily-Discord-Adapter running in HTTP mode (health endpoints active)")
+            # Keep the HTTP server running - Discord features are disabled
+            while True:
+                await asyncio.sleep(3600)
     
-    # Run the Discord bot
-    logger.info("Starting Lily-Discord-Adapter...")
-    bot_startup_attempted = True
+        # Run the Discord bot
+        logger.info("Starting Lily-Discord-Adapter...")
+        bot_startup_attempted = True
     
-    # Main execution loop
-    while True:
-        # Check current status from controller (source of truth)
-        status = bot_service.get_status()
-        current_enabled = status.get("bot_enabled", False)
+        # Main execution loop
+        while True:
+            # Check current status from controller (source of truth)
+            status = bot_service.get_status()
+            current_enabled = status.get("bot_enabled", False)
         
-        if current_enabled:
-            try:
-                logger.info("Bot enabled. Starting execution...")
+            if current_enabled:
+                try:
+                    logger.info("Bot enabled. Starting execution...")
                 
-                # Create a fresh Bot instance for each run
-                BOT = create_discord_bot()
+                    # Create a fresh Bot instance for each run
+                    BOT = create_discord_bot()
                 
-                # Update controller with new bot
-                bot_service.set_bot_references(BOT, True, True, loop)
+                    # Update controller with new bot
+                    bot_service.set_bot_references(BOT, True, True, loop)
                 
-                # Start the bot
-                await BOT.start(bot_token)
+                    # Start the bot
+                    await BOT.start(bot_token)
                 
-                logger.info("Bot execution finished (stopped).")
-            except Exception as e:
-                logger.error(f"Bot execution error: {e}")
-                # Prevent tight loop if it crashes immediately
-                await asyncio.sleep(5)
-            finally:
-                # Ensure bot is cleaned up
-                if BOT and not BOT.is_closed():
-                    try:
-                        await BOT.close()
-                    except:
-                        pass
-                BOT = None
-        else:
-            # Bot is disabled, wait
-            # Log periodically to show we are alive
-            if int(time.time()) % 60 == 0:
-                logger.info("Bot is disabled. Waiting for enable signal...")
-            await asyncio.sleep(1)
+                    logger.info("Bot execution finished (stopped).")
+                except Exception as e:
+                    logger.error(f"Bot execution error: {e}")
+                    # Prevent tight loop if it crashes immediately
+                    await asyncio.sleep(5)
+                finally:
+                    # Ensure bot is cleaned up
+                    if BOT and not BOT.is_closed():
+                        try:
+                            await BOT.close()
+                        except:
+                            pass
+                    BOT = None
+            else:
+                # Bot is disabled, wait
+                # Log periodically to show we are alive
+                if int(time.time()) % 60 == 0:
+                    logger.info("Bot is disabled. Waiting for enable signal...")
+                await asyncio.sleep(1)
+    finally:
+        await shutdown()
 
 
 if __name__ == "__main__":
@@ -5,10 +5,10 @@ Handles concurrent message processing with rate limiting and message queuing
 
 import asyncio
 import logging
+import os
 from typing import Optional
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import OrderedDict, deque
 import time
 
 logger = logging.getLogger("lily-discord-adapter")
@@ -25,6 +25,9 @@ class RateLimitConfig:
 class RateLimiter:
     """Token bucket rate limiter"""
     
+    # One instance per tracked user, so keep them small
+    __slots__ = ("config", "tokens", "last_update", "_lock")
+    
     def __init__(self, config: RateLimitConfig = None):
         self.config = config or RateLimitConfig()
         self.tokens = self.config.burst_limit
@@ -61,35 +64,36 @@ class MessageQueue:
     """Thread-safe message queue for async processing"""
     
     def __init__(self, max_size: int = 1000):
-        self._queue = asyncio.Queue(maxsize=max_size)
+        self._queue = deque()
+        self._not_empty = asyncio.Event()
+        self._max_size = max_size
         self._processing = 0
         self._lock = asyncio.Lock()
         self._errors = 0
     
     async def put(self, item, priority: int = 0):
         """Add item to queue with optional priority"""
-        try:
-            await asyncio.wait_for(self._queue.put((priority, item)), timeout=1.0)
-        except asyncio.TimeoutError:
+        if len(self._queue) >= self._max_size:
             logger.warning("Message queue full, dropping message")
             return False
+        self._queue.append(item)
+        self._not_empty.set()
         return True
     
     async def get(self):
         """Get item from queue"""
-        try:
-            priority, item = await self._queue.get()
-            return item
-        except asyncio.CancelledError:
-            raise
+        while not self._queue:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._queue.popleft()
     
     def qsize(self) -> int:
         """Get current queue size"""
-        return self._queue.qsize()
+        return len(self._queue)
     
     def empty(self) -> bool:
         """Check if queue is empty"""
-        return self._queue.empty()
+        return not self._queue
     
     @property
     def processing(self) -> int:
@@ -217,28 +221,44 @@ class ConcurrencyManager:
 
 
 # Per-user rate limiting
+MAX_TRACKED_USERS = int(os.getenv("MAX_TRACKED_USERS", "10000"))
+
+
 class UserRateLimiter:
     """Per-user rate limiter with configurable limits"""
     
-    def __init__(self, default_config: RateLimitConfig = None):
+    def __init__(self, default_config: RateLimitConfig = None, max_users: int = MAX_TRACKED_USERS):
         self.default_config = default_config or RateLimitConfig()
-        self._user_limits = {}
+        self.max_users = max_users
+        # Least recently seen users are evicted once max_users is exceeded
+        self._user_limits: "OrderedDict[str, RateLimiter]" = OrderedDict()
         self._lock = asyncio.Lock()
     
     def get_config_for_user(self, user_id: str) -> RateLimitConfig:
         """Get rate limit config for a user"""
-        return self._user_limits.get(user_id, self.default_config)
+        limiter = self._user_limits.get(user_id)
+        return limiter.config if limiter else self.default_config
+    
+    def _track(self, user_id: str, limiter: RateLimiter):
+        """Store a user's limiter, evicting the least recently seen user if over capacity"""
+        self._user_limits[user_id] = limiter
+        self._user_limits.move_to_end(user_id)
+        if len(self._user_limits) > self.max_users:
+            self._user_limits.popitem(last=False)
     
     async def acquire(self, user_id: str) -> bool:
         """Acquire token for user"""
         async with self._lock:
-            if user_id not in self._user_limits:
-                self._user_limits[user_id] = RateLimitConfig()
-            
-            limiter = RateLimiter(self._user_limits[user_id])
-            return await limiter.acquire(user_id)
+            limiter = self._user_limits.get(user_id)
+            if limiter is None:
+                limiter = RateLimiter(self.default_config)
+                self._track(user_id, limiter)
+            else:
+                self._user_limits.move_to_end(user_id)
+        
+        return await limiter.acquire(user_id)
     
     async def set_custom_limit(self, user_id: str, config: RateLimitConfig):
         """Set custom rate limit for a user"""
         async with self._lock:
-            self._user_limits[user_id] = config
+            self._track(user_id, RateLimiter(config))
@@ -20,9 +20,6 @@ class CookiesService:
 
     async def get_cookies_content(self, offset: int = 0, limit: int = None):
         """Read cookies file content"""
-        if not os.path.exists(self.file_path):
-            return None, self.file_path, 0
-        
         try:
             async with aiofiles.open(self.file_path, mode='r') as f:
                 content = await f.read()
@@ -33,6 +30,8 @@ class CookiesService:
                 content = content[offset:offset+limit]
                 
             return content, self.file_path, total_size
+        except FileNotFoundError:
+            return None, self.file_path, 0
         except Exception as e:
             logger.error(f"Error reading cookies file: {e}")
             raise e
@@ -43,9 +42,6 @@ class CookiesService:
 
     async def stream_cookies_content(self, chunk_size: int = 8192):
         """Yield chunks of cookies file content"""
-        if not os.path.exists(self.file_path):
-            return
-            
         try:
             async with aiofiles.open(self.file_path, mode='r') as f:
                 while True:
@@ -53,6 +49,8 @@ class CookiesService:
                     if not chunk:
                         break
                     yield chunk
+        except FileNotFoundError:
+            return
         except Exception as e:
             logger.error(f"Error streaming cookies file: {e}")
             raise e
@@ -60,7 +58,7 @@ class CookiesService:
     async def save_cookies(self, content_bytes: bytes):
         """Save content to cookies file"""
         directory = os.path.dirname(self.file_path)
-        if directory and not os.path.exists(directory):
+        if directory:
             os.makedirs(directory, exist_ok=True)
             
         try:
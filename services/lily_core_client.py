@@ -4,12 +4,21 @@ Low-level HTTP client for communicating with Lily-Core API
 Handles all HTTP requests and responses - no business logic
 """
 
+import asyncio
+import inspect
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import httpx
+import orjson
 
 logger = logging.getLogger("lily-discord-adapter")
 
+# Non-200 health checks tolerated before re-resolving the Lily-Core URL
+HEALTH_FAILURE_THRESHOLD = 3
+
+# Built once and reused for every request
+JSON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
 
 class LilyCoreClient:
     """HTTP client for Lily-Core API - pure communication layer"""
@@ -19,18 +28,45 @@ class LilyCoreClient:
         Initialize the Lily-Core HTTP client.
         
         Args:
-            get_http_url_func: Function that returns the Lily-Core HTTP URL
+            get_http_url_func: Function (or coroutine function) that returns the
+                Lily-Core HTTP URL, or a list of candidate URLs (one per replica)
         """
         self.get_http_url_func = get_http_url_func
         self.http_url = None
-        self.http_client = httpx.AsyncClient(timeout=120.0)
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=5.0),
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=75.0
+            )
+        )
+        # Consecutive failed health checks before the cached URL is dropped
+        self._health_failures = 0
     
-    async def get_base_url(self, force_refresh: bool = False) -> Optional[str]:
-        """Get the Lily-Core base HTTP URL"""
+    def get_base_url(self) -> Optional[str]:
+        """Get the cached Lily-Core base HTTP URL"""
+        return self.http_url
+    
+    async def resolve_base_url(self, force_refresh: bool = False) -> Optional[str]:
+        """Get the Lily-Core base HTTP URL, resolving it if unset or a refresh is forced"""
         if force_refresh or not self.http_url:
-            self.http_url = self.get_http_url_func()
+            candidates = await self._get_candidate_urls()
+            self.http_url = candidates[0] if candidates else None
         return self.http_url
     
+    async def _get_candidate_urls(self) -> List[str]:
+        """Normalize the URL function's result to a list of candidate URLs"""
+        result = self.get_http_url_func()
+        if inspect.isawaitable(result):
+            result = await result
+        if not result:
+            return []
+        if isinstance(result, str):
+            return [result]
+        return [url for url in result if url]
+    
     async def send_chat_request(self, message: str, user_id: str, username: str) -> Optional[dict]:
         """
         Send a chat request to Lily-Core.
@@ -43,7 +79,7 @@ class LilyCoreClient:
         Returns:
             Response data from Lily-Core or None on error
         """
-        http_url = await self.get_base_url()
+        http_url = await self.resolve_base_url()
         
         if not http_url:
             logger.error("lily-core HTTP URL not found")
@@ -60,12 +96,14 @@ class LilyCoreClient:
         try:
             response = await self.http_client.post(
                 f"{http_url}/chat",
-                json=payload,
-                timeout=120.0
+                content=orjson.dumps(payload),
+                headers=JSON_HEADERS
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode_response(response)
+                if data is None:
+                    return None
                 logger.info(f"Received response from lily-core: {data}")
                 return data
             else:
@@ -82,23 +120,82 @@ class LilyCoreClient:
             logger.error(f"Unexpected error in HTTP request: {e}")
             return None
     
+    def _decode_response(self, response: httpx.Response) -> Optional[dict]:
+        """Decode a Lily-Core response body based on its Content-Type"""
+        content_type = response.headers.get("content-type", "")
+        if content_type and "json" not in content_type:
+            logger.error(f"Unsupported response content type from lily-core: {content_type}")
+            return None
+        return orjson.loads(response.content)
+    
     async def close(self):
         """Close the HTTP client"""
         await self.http_client.aclose()
     
     async def health_check(self) -> bool:
         """Check if Lily-Core is available"""
-        http_url = await self.get_base_url()
-        if not http_url:
-            return False
+        if not self.http_url:
+            candidates = await self._get_candidate_urls()
+            if len(candidates) > 1:
+                # Several replicas: probe them all at once and keep the first healthy one
+                self.http_url = await self._first_healthy_url(candidates)
+                if self.http_url:
+                    self._health_failures = 0
+                    return True
+                return False
+            if not candidates:
+                return False
+            # A single candidate needs no race; reuse this lookup for the check below
+            self.http_url = candidates[0]
+        
+        http_url = self.http_url
         
         try:
-            response = await self.http_client.get(f"{http_url}/health", timeout=10.0)
+            response = await self.http_client.get(
+                f"{http_url}/health",
+                headers=JSON_HEADERS,
+                timeout=10.0
+            )
             if response.status_code == 200:
+                self._health_failures = 0
                 return True
             else:
-                self.http_url = None  # Invalidate cache
+                self._record_health_failure()
                 return False
         except Exception:
+            # Connection-level failure: the URL itself is suspect
             self.http_url = None  # Invalidate cache
             return False
+    
+    async def _probe_health(self, http_url: str) -> Optional[str]:
+        """Return http_url if its /health endpoint answers 200, else None"""
+        try:
+            response = await self.http_client.get(
+                f"{http_url}/health",
+                headers=JSON_HEADERS,
+                timeout=2.0
+            )
+            return http_url if response.status_code == 200 else None
+        except Exception:
+            return None
+    
+    async def _first_healthy_url(self, urls: List[str]) -> Optional[str]:
+        """Probe candidate URLs concurrently; return the first healthy one"""
+        tasks = [asyncio.create_task(self._probe_health(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                http_url = await next_done
+                if http_url:
+                    logger.info(f"Selected lily-core replica at {http_url}")
+                    return http_url
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _record_health_failure(self):
+        """Invalidate the cached URL only after repeated non-200 health checks"""
+        self._health_failures += 1
+        if self._health_failures >= HEALTH_FAILURE_THRESHOLD:
+            self._health_failures = 0
+            self.http_url = None  # Invalidate cache
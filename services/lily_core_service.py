@@ -5,8 +5,7 @@ Uses LilyCoreClient for HTTP communication
 """
 
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional
 
 from services.lily_core_client import LilyCoreClient
 
@@ -29,8 +28,7 @@ class LilyCoreService:
         self, 
         user_id: str, 
         username: str, 
-        text: str, 
-        attachments: list = None
+        text: str
     ) -> Optional[str]:
         """
         Send a chat message to Lily-Core and get the response.
@@ -39,17 +37,13 @@ class LilyCoreService:
             user_id: The user's ID
             username: The user's username
             text: The message text
-            attachments: Optional list of attachments
         
         Returns:
             The response text from Lily-Core, or None on error
         """
-        # Create the message payload
-        message = self._create_chat_message(user_id, username, text, attachments)
-        
-        # Send via client
+        # The chat endpoint only takes text/user_id/username
         result = await self._client.send_chat_request(
-            message=message.get("text", ""),
+            message=text or "",
             user_id=user_id,
             username=username
         )
@@ -65,74 +59,8 @@ class LilyCoreService:
     
     async def get_http_url(self) -> Optional[str]:
         """Get the Lily-Core HTTP URL"""
-        return await self._client.get_base_url()
+        return await self._client.resolve_base_url()
 
     async def close(self):
         """Close the service and underlying client"""
         await self._client.close()
-    
-    # ==================== Message Builders (Business Logic) ====================
-    
-    def _create_chat_message(
-        self, 
-        user_id: str, 
-        username: str, 
-        text: str, 
-        attachments: list = None
-    ) -> Dict[str, Any]:
-        """Create a chat message payload"""
-        return {
-            "type": "message",
-            "user_id": user_id,
-            "username": username,
-            "text": text,
-            "attachments": attachments or [],
-            "source": "discord",
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    def create_session_start_message(
-        self, 
-        user_id: str, 
-        username: str, 
-        text: str = ""
-    ) -> Dict[str, Any]:
-        """Create a session start message payload"""
-        return {
-            "type": "session_start",
-            "user_id": user_id,
-            "username": username,
-            "text": text,
-            "source": "discord",
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    def create_session_end_message(
-        self, 
-        user_id: str, 
-        username: str
-    ) -> Dict[str, Any]:
-        """Create a session end message payload"""
-        return {
-            "type": "session_end",
-            "user_id": user_id,
-            "username": username,
-            "text": "",
-            "source": "discord",
-            "timestamp": datetime.now().isoformat()
-        }
-    
-    def create_session_no_active_message(
-        self, 
-        user_id: str, 
-        username: str
-    ) -> Dict[str, Any]:
-        """Create a session no active message payload"""
-        return {
-            "type": "session_no_active",
-            "user_id": user_id,
-            "username": username,
-            "text": "",
-            "source": "discord",
-            "timestamp": datetime.now().isoformat()
-        }
@@ -1,12 +1,16 @@
 import asyncio
+import concurrent.futures
+import contextlib
 import logging
 import os
-from collections import deque
-from typing import Dict, Optional
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
 import discord
 from discord.ext import commands
-import json
-import subprocess
 import sys
 
 logger = logging.getLogger("lily-discord-adapter")
@@ -17,113 +21,251 @@ FFMPEG_OPTIONS = {
     'options': '-vn',
 }
 
+# Playback volume; at 1.0, Opus streams are passed through to Discord as-is
+MUSIC_VOLUME = float(os.getenv("MUSIC_VOLUME", "0.5"))
+
 from services.bot_service import bot_service
 
-async def run_yt_dlp(url):
-    """Run yt-dlp binary with options for streaming"""
-    # Path to yt-dlp binary (assumed to be in the project root or accessible)
-    # We try to locate it relative to the project root
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    binary_path = os.path.join(base_dir, 'yt-dlp')
-    
-    if not os.path.exists(binary_path):
-        binary_path = 'yt-dlp'
-        
-    cmd = [sys.executable, binary_path]
-    
-    # Common options
-    cmd.append('--no-playlist')
-    cmd.append('--no-check-certificate')
-    cmd.append('--quiet')
-    cmd.append('--no-warnings')
-    cmd.extend(['--default-search', 'auto'])
-    cmd.extend(['--source-address', '0.0.0.0'])
-    cmd.extend(['--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'])
-    
+# yt-dlp ships with the adapter as a zipapp in the project root; it is imported
+# in-process from there instead of spawning a Python interpreter per song
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+YT_DLP_BUNDLE = os.path.join(BASE_DIR, 'yt-dlp')
+
+# Same flags the yt-dlp CLI used to be invoked with, parsed by yt-dlp itself
+YTDL_ARGS = [
+    '--no-playlist',
+    '--no-check-certificate',
+    '--quiet',
+    '--no-warnings',
+    '--default-search', 'auto',
+    '--source-address', '0.0.0.0',
+    '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
     # Fix for n-token challenges
-    cmd.extend(['--js-runtimes', 'node'])
-    cmd.extend(['--remote-components', 'ejs:github'])
-    
-    # Cookies
-    cookies_file = '/app/data/cookies.txt'
-    local_cookies = os.path.join(base_dir, 'cookies.txt')
-
-    if os.path.exists(cookies_file):
-        cmd.extend(['--cookies', cookies_file])
-        logger.info(f"Using cookies from {cookies_file}")
-    elif os.path.exists(local_cookies):
-         cmd.extend(['--cookies', local_cookies])
-         logger.info(f"Using cookies from local file: {local_cookies}")
-    else:
-        logger.info("Cookies file not found. Using visitor/guest mode.")
-
-    # Streaming mode: get JSON metadata without downloading
-    cmd.append('--dump-single-json')
-    cmd.extend(['-f', 'bestaudio/best'])
-    cmd.append(url)
-    
-    # logger.info(f"Running command: {' '.join(cmd)}")
+    '--js-runtimes', 'node',
+    '--remote-components', 'ejs:github',
+    '-f', 'bestaudio/best',
+]
 
-    process = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
+# Metadata fields kept after extraction; the rest (format lists, thumbnails,
+# subtitles...) is dropped so cached entries stay small
+META_FIELDS = ('id', 'title', 'url', 'acodec', 'duration', 'webpage_url')
 
-    stdout, stderr = await process.communicate()
+# Extraction results are reused for an hour; signed stream URLs last ~6h
+META_CACHE_TTL = 3600.0
+META_CACHE_MAX_ENTRIES = 256
 
-    if process.returncode != 0:
-        error_msg = stderr.decode().strip()
-        logger.error(f"yt-dlp error: {error_msg}")
-        raise Exception(f"yt-dlp failed: {error_msg}")
+COOKIES_FILE = '/app/data/cookies.txt'
+LOCAL_COOKIES_FILE = os.path.join(BASE_DIR, 'cookies.txt')
 
-    output = stdout.decode().strip()
-    
+# YoutubeDL isn't thread-safe, so each extraction thread gets its own
+# instance, rebuilt only when the cookies file changes
+_ytdl_local = threading.local()
+
+
+def find_cookies_file() -> Optional[str]:
+    """Return the cookies file to use, if any"""
+    if os.path.exists(COOKIES_FILE):
+        return COOKIES_FILE
+    if os.path.exists(LOCAL_COOKIES_FILE):
+        return LOCAL_COOKIES_FILE
+    return None
+
+
+def import_yt_dlp():
+    """Import yt-dlp on first use, so a missing bundle only disables music"""
+    if os.path.exists(YT_DLP_BUNDLE) and YT_DLP_BUNDLE not in sys.path:
+        sys.path.insert(0, YT_DLP_BUNDLE)
     try:
-        data = json.loads(output)
-        return data
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse yt-dlp output: {output}")
-        raise e
+        import yt_dlp
+    except ImportError as e:
+        raise ImportError(
+            f"yt-dlp not found: expected the bundled zipapp at {YT_DLP_BUNDLE} "
+            "or an installed yt-dlp package"
+        ) from e
+    return yt_dlp
+
+
+def get_ytdl():
+    """Get this thread's YoutubeDL instance for the current cookies file"""
+    yt_dlp = import_yt_dlp()
+    cookies_file = find_cookies_file()
+    try:
+        key = (cookies_file, os.path.getmtime(cookies_file) if cookies_file else None)
+    except OSError:
+        cookies_file, key = None, (None, None)
+    
+    ytdl = getattr(_ytdl_local, 'ytdl', None)
+    if ytdl is None or key != getattr(_ytdl_local, 'key', None):
+        args = list(YTDL_ARGS)
+        if cookies_file:
+            args.extend(['--cookies', cookies_file])
+            logger.info(f"Using cookies from {cookies_file}")
+        else:
+            logger.info("Cookies file not found. Using visitor/guest mode.")
+        ytdl = yt_dlp.YoutubeDL(yt_dlp.parse_options(args).ydl_opts)
+        _ytdl_local.ytdl = ytdl
+        _ytdl_local.key = key
+    return ytdl
+
+
+def _extract_info_blocking(url: str) -> dict:
+    """Run yt-dlp extraction on the calling (executor) thread"""
+    return get_ytdl().extract_info(url, download=False)
 
 
 class YTDLSource(discord.PCMVolumeTransformer):
-    def __init__(self, source, *, data, volume=0.5):
+    def __init__(self, source, *, data, volume=MUSIC_VOLUME):
         super().__init__(source, volume)
         self.data = data
         self.title = data.get('title')
         self.url = data.get('url')
 
     @classmethod
-    async def from_url(cls, url, *, loop=None):
-        loop = loop or asyncio.get_event_loop()
-        
-        try:
-            data = await run_yt_dlp(url)
-        except Exception as e:
-            logger.error(f"yt-dlp streaming error: {e}")
-            raise e
-
-        if 'entries' in data:
-            # take first item from a playlist
-            data = data['entries'][0]
+    async def from_url(cls, url, *, loop=None, executor=None):
+        data = await extract_info(url, loop=loop, executor=executor)
+        return cls.from_data(data)
 
+    @classmethod
+    def from_data(cls, data: dict):
+        """Build a player from already extracted yt-dlp metadata"""
         stream_url = data['url']
+        if data.get('acodec') == 'opus' and MUSIC_VOLUME == 1.0:
+            # No volume change needed, so skip decoding to PCM and re-encoding
+            return YTDLOpusSource(stream_url, data=data)
         return cls(discord.FFmpegPCMAudio(stream_url, **FFMPEG_OPTIONS), data=data)
 
 
+class YTDLOpusSource(discord.FFmpegOpusAudio):
+    """Plays an Opus stream without re-encoding it"""
+
+    def __init__(self, stream_url, *, data):
+        super().__init__(stream_url, codec='opus', **FFMPEG_OPTIONS)
+        self.data = data
+        self.title = data.get('title')
+        self.url = data.get('url')
+
+
+async def extract_info(url: str, *, loop=None, executor=None) -> dict:
+    """Extract stream metadata for a URL (or search term) with yt-dlp"""
+    loop = loop or asyncio.get_event_loop()
+    
+    try:
+        data = await loop.run_in_executor(executor, _extract_info_blocking, url)
+    except Exception as e:
+        logger.error(f"yt-dlp streaming error: {e}")
+        raise e
+
+    if 'entries' in data:
+        # take first item from a playlist
+        data = data['entries'][0]
+    return {key: data.get(key) for key in META_FIELDS}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL for cache lookups, keeping only the video id query param"""
+    url = url.strip()
+    parsed = urlparse(url)
+    if not parsed.scheme or not parsed.netloc:
+        # Search term rather than a URL
+        return url
+    video_id = parse_qs(parsed.query).get('v')
+    query = urlencode({'v': video_id[0]}) if video_id else ''
+    return parsed._replace(query=query, fragment='').geturl()
+
+
+def stream_expiry(data: dict, now: float) -> float:
+    """Wall-clock time after which cached metadata should not be reused"""
+    expires_at = now + META_CACHE_TTL
+    expire = parse_qs(urlparse(data.get('url') or '').query).get('expire')
+    if expire:
+        try:
+            # Leave a minute of headroom before the signed stream URL expires
+            expires_at = min(expires_at, float(expire[0]) - 60)
+        except ValueError:
+            pass
+    return expires_at
+
+
+@dataclass(slots=True)
+class GuildMusicState:
+    """Playback state for a single guild"""
+    # deque of (url, context)
+    queue: deque = field(default_factory=deque)
+    playing: bool = False
+    # Serializes play_next so a skip and a finished-track callback can't race
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
 class MusicService:
     def __init__(self):
-        # Dictionary to store queues per guild
-        # Key: Guild ID, Value: deque of (url, context)
-        self.queues: Dict[int, deque] = {}
-        # Dictionary to track if music is currently playing per guild
-        self.is_playing: Dict[int, bool] = {}
+        # Per-guild playback state, keyed by guild ID
+        self._guilds: Dict[int, GuildMusicState] = defaultdict(GuildMusicState)
+        # Dedicated pool so yt-dlp extraction can't starve the default executor
+        self._ytdl_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=int(os.getenv("YTDL_WORKERS", "4")),
+            thread_name_prefix="ytdl"
+        )
+        # Extraction cache: canonical URL -> (expires_at, data)
+        self._meta_cache: Dict[str, Tuple[float, dict]] = {}
+        # Per-URL extraction locks, kept only while some caller holds or awaits one
+        self._meta_locks: Dict[str, asyncio.Lock] = {}
+        self._meta_lock_users: Dict[str, int] = {}
 
     def get_queue(self, guild_id: int) -> deque:
-        if guild_id not in self.queues:
-            self.queues[guild_id] = deque()
-        return self.queues[guild_id]
+        return self._guilds[guild_id].queue
+
+    def _get_cached_meta(self, key: str) -> Optional[dict]:
+        """Return cached metadata for a canonical URL if it hasn't expired"""
+        entry = self._meta_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if time.time() >= expires_at:
+            del self._meta_cache[key]
+            return None
+        return data
+
+    def _meta_cache_has(self, url: str) -> bool:
+        """Check whether a URL's metadata can be served from the cache"""
+        return self._get_cached_meta(canonicalize_url(url)) is not None
+
+    async def extract(self, url: str, loop=None) -> dict:
+        """Extract metadata for a URL, reusing recent results"""
+        key = canonicalize_url(url)
+        data = self._get_cached_meta(key)
+        if data is not None:
+            return data
+
+        # One extraction per URL at a time; later callers reuse its result
+        lock = self._meta_locks.get(key)
+        if lock is None:
+            lock = self._meta_locks[key] = asyncio.Lock()
+        self._meta_lock_users[key] = self._meta_lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                data = self._get_cached_meta(key)
+                if data is not None:
+                    return data
+                data = await extract_info(url, loop=loop, executor=self._ytdl_pool)
+                self._store_meta(key, data)
+            return data
+        finally:
+            # Drop the lock with its last user, not merely when it's released:
+            # waiters still queued on it must not race a fresh lock for the URL
+            users = self._meta_lock_users[key] - 1
+            if users:
+                self._meta_lock_users[key] = users
+            else:
+                del self._meta_lock_users[key]
+                del self._meta_locks[key]
+
+    def _store_meta(self, key: str, data: dict):
+        """Cache metadata, evicting the oldest entry when full"""
+        self._meta_cache.pop(key, None)
+        self._meta_cache[key] = (stream_expiry(data, time.time()), data)
+        while len(self._meta_cache) > META_CACHE_MAX_ENTRIES:
+            oldest = next(iter(self._meta_cache))
+            del self._meta_cache[oldest]
 
     async def join_channel(self, ctx: commands.Context) -> bool:
         """Joins the user's voice channel"""
@@ -140,49 +282,60 @@ class MusicService:
 
     async def add_to_queue(self, ctx: commands.Context, url: str):
         """Adds a song to the queue and starts playing if idle"""
-        queue = self.get_queue(ctx.guild.id)
-        queue.append((url, ctx))
+        state = self._guilds[ctx.guild.id]
+        state.queue.append((url, ctx))
         
         await ctx.send(f"Added to queue: {url}")
 
-        if not self.is_playing.get(ctx.guild.id, False):
+        if not state.playing:
             await self.play_next(ctx.guild.id)
 
     async def play_next(self, guild_id: int):
         """Plays the next song in the queue for a guild"""
-        queue = self.get_queue(guild_id)
+        state = self._guilds[guild_id]
+        async with state.lock:
+            await self._play_next_locked(guild_id, state)
+
+    async def _play_next_locked(self, guild_id: int, state: GuildMusicState):
+        """play_next body; caller holds state.lock"""
+        queue = state.queue
         
-        if not queue:
-            self.is_playing[guild_id] = False
-            return
-
-        self.is_playing[guild_id] = True
-        url, ctx = queue.popleft()
-
-        # Ensure we are joined
-        if not ctx.voice_client:
-             if not await self.join_channel(ctx):
-                 self.is_playing[guild_id] = False
-                 return
-
-        async with ctx.typing():
-            try:
-                player = await YTDLSource.from_url(url, loop=ctx.bot.loop)
-                ctx.voice_client.play(
-                    player, 
-                    after=lambda e: self._play_next_callback(guild_id, e, ctx.bot.loop)
-                )
-                await ctx.send(f"Now playing: **{player.title}**")
-            except Exception as e:
-                error_msg = str(e)
-                if "Sign in to confirm" in error_msg:
-                    await ctx.send("I couldn't play that song because YouTube requires sign-in. Please try a different song or check bot configuration.")
-                else:
-                    await ctx.send(f"An error occurred playing this song.")
-                
-                logger.error(f"Error playing audio in guild {guild_id}: {e}")
-                # Try next song if this one failed
-                await self.play_next(guild_id)
+        # Loop rather than recurse so a run of unplayable songs doesn't stack frames
+        while True:
+            if not queue:
+                state.playing = False
+                return
+
+            state.playing = True
+            url, ctx = queue.popleft()
+
+            # Ensure we are joined
+            if not ctx.voice_client:
+                 if not await self.join_channel(ctx):
+                     state.playing = False
+                     return
+
+            # Cache hits are near-instant, so don't bother showing "typing..."
+            typing = contextlib.nullcontext() if self._meta_cache_has(url) else ctx.typing()
+            async with typing:
+                try:
+                    data = await self.extract(url, loop=ctx.bot.loop)
+                    player = YTDLSource.from_data(data)
+                    ctx.voice_client.play(
+                        player, 
+                        after=lambda e: self._play_next_callback(guild_id, e, ctx.bot.loop)
+                    )
+                    await ctx.send(f"Now playing: **{player.title}**")
+                    return
+                except Exception as e:
+                    error_msg = str(e)
+                    if "Sign in to confirm" in error_msg:
+                        await ctx.send("I couldn't play that song because YouTube requires sign-in. Please try a different song or check bot configuration.")
+                    else:
+                        await ctx.send(f"An error occurred playing this song.")
+                    
+                    logger.error(f"Error playing audio in guild {guild_id}: {e}")
+            # Try next song since this one failed
 
     def _play_next_callback(self, guild_id: int, error, loop):
         """Callback for when audio finishes playing"""
@@ -202,11 +355,13 @@ class MusicService:
             
     async def stop(self, ctx: commands.Context):
         """Stops playing and clears the queue"""
-        queue = self.get_queue(ctx.guild.id)
-        queue.clear()
+        self._guilds[ctx.guild.id].queue.clear()
         
         if ctx.voice_client:
             ctx.voice_client.stop()
             await ctx.voice_client.disconnect()
             await ctx.send("Stopped playing and disconnected.")
 
+    async def close(self):
+        """Release the extraction thread pool"""
+        self._ytdl_pool.shutdown(wait=False)
@@ -5,24 +5,32 @@ Conversation history is stored in Lily-Core's MemoryService.
 """
 
 import logging
-from typing import Dict, Optional
-from dataclasses import dataclass, field
-from datetime import datetime
-import uuid
+import re
+from collections import OrderedDict
+from typing import Callable, Optional
+from dataclasses import dataclass
+import secrets
+import sys
 
 logger = logging.getLogger("lily-discord-adapter")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SessionConfig:
     """Configuration for session behavior"""
     max_sessions: int = 1000  # Maximum total sessions
 
 
+# Shared by every session/service created without an explicit config
+_DEFAULT_CONFIG = SessionConfig()
+
+
 class UserSession:
     """Represents a user's active session with Lily - state only, no history"""
-    
-    def __init__(self, 
+
+    __slots__ = ("user_id", "username", "channel", "config", "active", "session_id")
+
+    def __init__(self,
                  user_id: str, 
                  username: str, 
                  channel,
@@ -33,25 +41,15 @@ class UserSession:
         self.user_id = user_id
         self.username = username
         self.channel = channel
-        self.config = config or SessionConfig()
+        self.config = config if config is not None else _DEFAULT_CONFIG
         
         # Session lifecycle
-        self.created_at = datetime.now()
         self.active = True
         
         # Session ID for tracking
-        self.session_id = str(uuid.uuid4())[:8]
+        self.session_id = secrets.token_hex(4)
         
-        logger.info(f"Session created: {self.session_id} for user {username} ({user_id})")
-    
-    def is_active(self) -> bool:
-        """Check if session is active"""
-        return self.active
-    
-    def end_session(self):
-        """End the session"""
-        self.active = False
-        logger.info(f"Session ended: {self.session_id} for user {self.username}")
+        logger.info("Session created: %s for user %s (%s)", self.session_id, username, user_id)
     
     def start_session(self):
         """Start/renew the session"""
@@ -59,65 +57,99 @@ class UserSession:
 
 
 class SessionService:
-    """Service for managing user sessions (State synced with Core)"""
+    """Service for managing user sessions (State synced with Core)
+
+    Sessions are keyed by interned str user IDs; public methods normalize
+    int IDs (e.g. from Lily-Core JSON) so the dict never sees other key types.
+    """
     
     # Wake word configuration
     WAKE_PHRASE = "hey lily"
     GOODBYE_PHRASE = "goodbye lily"
+    # Compiled once; matching is case-insensitive without lowercasing the message.
+    # ASCII-only case folding, so look-alikes such as "lıly" (dotless i) don't match.
+    # Group 1 of the wake pattern is whatever follows the phrase (and any punctuation).
+    _WAKE_RE = re.compile(re.escape(WAKE_PHRASE) + r"[\s,.!?]*(.*)", re.IGNORECASE | re.ASCII | re.DOTALL)
+    _GOODBYE_RE = re.compile(re.escape(GOODBYE_PHRASE), re.IGNORECASE | re.ASCII)
     
-    def __init__(self, config: SessionConfig = None):
+    def __init__(self, config: SessionConfig = None, on_evict: Optional[Callable[[UserSession], None]] = None):
         """
         Initialize session service.
+        
+        Args:
+            config: Session behavior configuration
+            on_evict: Called with each session dropped to stay within max_sessions
         """
-        self.config = config or SessionConfig()
-        self._sessions: Dict[str, UserSession] = {}
+        self.config = config if config is not None else _DEFAULT_CONFIG
+        self.on_evict = on_evict
+        # Ordered least to most recently used, so the oldest is evicted first.
+        # Every mutation below is synchronous (no awaits), so each runs to
+        # completion on the event loop and needs no lock.
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
         
         # Statistics
         self._total_sessions = 0
     
     def get_session(self, user_id: str) -> Optional[UserSession]:
         """Get session for a user"""
-        return self._sessions.get(user_id)
+        user_id = sys.intern(str(user_id))
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._sessions.move_to_end(user_id)
+        return session
     
     def create_session(self, user_id: str, username: str, channel) -> UserSession:
         """Create a new session for a user"""
+        user_id = sys.intern(str(user_id))
         session = UserSession(
             user_id=user_id,
             username=username,
             channel=channel,
             config=self.config
         )
+        self._sessions.pop(user_id, None)
+        if len(self._sessions) >= self.config.max_sessions:
+            # At capacity: drop the least recently used session
+            evicted_id, evicted = self._sessions.popitem(last=False)
+            evicted.active = False
+            logger.warning("Evicted session %s for user %s (max_sessions reached)", evicted.session_id, evicted_id)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
         self._sessions[user_id] = session
         self._total_sessions += 1
         return session
     
     def end_session(self, user_id: str) -> bool:
         """End a user's session (Called when Goodbye said or Core expires it)"""
-        if user_id in self._sessions:
-            self._sessions[user_id].end_session()
-            del self._sessions[user_id] # Clean up
-            logger.info(f"Ended and removed session for user {user_id}")
-            return True
-        return False
+        user_id = sys.intern(str(user_id))
+        session = self._sessions.pop(user_id, None)
+        if session is None:
+            return False
+        # Mark it inactive for anyone still holding it; one log line per removal
+        session.active = False
+        logger.info("Ended and removed session %s for user %s", session.session_id, user_id)
+        return True
     
     def is_session_active(self, user_id: str) -> bool:
         """Check if user has an active session"""
-        session = self.get_session(user_id)
+        user_id = sys.intern(str(user_id))
+        session = self._sessions.get(user_id)
         if session is None:
             return False
-        return session.is_active()
+        self._sessions.move_to_end(user_id)
+        return session.active
     
     def is_wake_phrase(self, content: str) -> bool:
         """Check if content starts with wake phrase"""
-        return content.lower().startswith(self.WAKE_PHRASE)
+        return self._WAKE_RE.match(content) is not None
     
     def is_goodbye_phrase(self, content: str) -> bool:
         """Check if content equals goodbye phrase"""
-        return content.lower() == self.GOODBYE_PHRASE
+        return self._GOODBYE_RE.fullmatch(content) is not None
     
     def extract_message_after_wake(self, content: str) -> str:
         """Extract message content after the wake phrase"""
-        words = content.split(' ', 1)
-        if len(words) > 1:
-            return words[1].strip()
-        return ""
+        match = self._WAKE_RE.match(content)
+        if match is None:
+            return ""
+        return match.group(1).strip()
@@ -0,0 +1,68 @@
+import asyncio
+
+from services.concurrency_manager import MessageQueue, RateLimitConfig, UserRateLimiter
+
+
+# No refill, so only the burst allowance is available
+NO_REFILL = RateLimitConfig(max_requests_per_second=0, burst_limit=2)
+
+
+async def test_user_rate_limiter_enforces_burst_limit_per_user():
+    limiter = UserRateLimiter(NO_REFILL)
+
+    assert await limiter.acquire("alice")
+    assert await limiter.acquire("alice")
+    assert not await limiter.acquire("alice")
+
+    # Other users have their own bucket
+    assert await limiter.acquire("bob")
+
+
+async def test_user_rate_limiter_evicts_least_recently_seen_user():
+    limiter = UserRateLimiter(NO_REFILL, max_users=2)
+
+    await limiter.acquire("alice")
+    await limiter.acquire("bob")
+    # Touch alice so bob becomes the least recently seen
+    await limiter.acquire("alice")
+    await limiter.acquire("carol")
+
+    assert list(limiter._user_limits) == ["alice", "carol"]
+
+    # alice's spent bucket survived; bob comes back with a fresh one
+    assert not await limiter.acquire("alice")
+    assert await limiter.acquire("bob")
+    assert list(limiter._user_limits) == ["alice", "bob"]
+
+
+async def test_message_queue_is_fifo():
+    queue = MessageQueue()
+
+    for item in ("a", "b", "c"):
+        assert await queue.put(item)
+
+    assert [await queue.get() for _ in range(3)] == ["a", "b", "c"]
+    assert queue.empty()
+
+
+async def test_message_queue_rejects_when_full():
+    queue = MessageQueue(max_size=2)
+
+    assert await queue.put("a")
+    assert await queue.put("b")
+    assert not await queue.put("c")
+    assert queue.qsize() == 2
+
+    await queue.get()
+    assert await queue.put("c")
+
+
+async def test_message_queue_wakes_waiting_consumer():
+    queue = MessageQueue()
+
+    consumer = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    assert not consumer.done()
+
+    await queue.put("hello")
+    assert await asyncio.wait_for(consumer, timeout=1) == "hello"
@@ -0,0 +1,69 @@
+import httpx
+import pytest
+
+from services.lily_core_client import LilyCoreClient
+
+
+def make_client(handler):
+    client = LilyCoreClient(lambda: "http://lily-core")
+    client.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+async def test_chat_request_returns_response():
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        return httpx.Response(200, json={"response": "Hi!"})
+
+    client = make_client(handler)
+    result = await client.send_chat_request("Hello", "123", "TestUser")
+    await client.close()
+
+    assert result == {"response": "Hi!"}
+    assert paths == ["/chat"]
+
+
+@pytest.mark.parametrize("status", [404, 405, 500])
+async def test_chat_request_error_status_returns_none(status):
+    client = make_client(lambda request: httpx.Response(status, text="nope"))
+    result = await client.send_chat_request("Hello", "123", "TestUser")
+    await client.close()
+
+    assert result is None
+
+
+async def test_chat_request_malformed_json_returns_none():
+    def handler(request):
+        return httpx.Response(200, content=b"{not json", headers={"content-type": "application/json"})
+
+    client = make_client(handler)
+    result = await client.send_chat_request("Hello", "123", "TestUser")
+    await client.close()
+
+    assert result is None
+
+
+async def test_chat_request_non_json_content_type_returns_none():
+    client = make_client(lambda request: httpx.Response(200, text="<html></html>", headers={"content-type": "text/html"}))
+    result = await client.send_chat_request("Hello", "123", "TestUser")
+    await client.close()
+
+    assert result is None
+
+
+async def test_health_check_single_candidate_resolves_once():
+    lookups = []
+
+    def get_url():
+        lookups.append(1)
+        return ["http://lily-core"]
+
+    client = LilyCoreClient(get_url)
+    client.http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    assert await client.health_check()
+    await client.close()
+
+    assert lookups == [1]
+    assert client.get_base_url() == "http://lily-core"
@@ -1,22 +1,37 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 from controllers.message_controller import MessageController
 from services.session_service import SessionService
 from services.lily_core_service import LilyCoreService
 
-@pytest.mark.asyncio
-async def test_handle_chat_message():
-    # Setup mocks
+
+@pytest.fixture(scope="module")
+def controller_bundle():
+    """Controller and spec'd service mocks, built once for the module"""
     bot = MagicMock()
     session_service = MagicMock(spec=SessionService)
     lily_core_service = MagicMock(spec=LilyCoreService)
+    controller = MessageController(bot, session_service, lily_core_service)
+    return controller, session_service, lily_core_service
+
+
+@pytest.fixture(autouse=True)
+def reset_bundle(controller_bundle):
+    """Give every test clean mocks and controller state"""
+    controller, session_service, lily_core_service = controller_bundle
+    session_service.reset_mock(return_value=True, side_effect=True)
+    lily_core_service.reset_mock(return_value=True, side_effect=True)
+    controller.lily_core_service = lily_core_service
+    controller._user_sessions.clear()
+
+
+async def test_handle_chat_message(controller_bundle):
+    controller, session_service, lily_core_service = controller_bundle
     
     # Setup async methods
     lily_core_service.send_chat_message = AsyncMock()
     
-    # Initialize controller
-    controller = MessageController(bot, session_service, lily_core_service)
-    
     # Mock user session
     session_service.is_session_active.return_value = True
     session_service.is_wake_phrase.return_value = False
@@ -47,26 +62,19 @@ async def test_handle_chat_message():
     await controller.handle_user_message(message)
 
     lily_core_service.send_chat_message.assert_called_with(
-        "123", "TestUser", "Hello Lily", []
+        "123", "TestUser", "Hello Lily"
     )
     # The controller awaits the channel.send coroutine when a response is returned
     # Since mocked methods return None or awaitable, check if channel.send was called
     message.channel.send.assert_called()
 
 
-@pytest.mark.asyncio
-async def test_wake_phrase():
-    # Setup mocks
-    bot = MagicMock()
-    session_service = MagicMock(spec=SessionService)
-    lily_core_service = MagicMock(spec=LilyCoreService)
+async def test_wake_phrase(controller_bundle):
+    controller, session_service, lily_core_service = controller_bundle
     
     # Make send_chat_message return a non-empty string so channel.send is called
-    lily_core_service.send_chat_message.return_value = "Hello there!"
     lily_core_service.send_chat_message = AsyncMock(return_value="Hello there!")
     
-    controller = MessageController(bot, session_service, lily_core_service)
-    
     # Mock session service
     session_service.is_wake_phrase.return_value = True
     session_service.extract_message_after_wake.return_value = "Hello"
@@ -94,17 +102,11 @@ async def test_wake_phrase():
     message.channel.send.assert_called_once_with("Hello there!")
 
 
-@pytest.mark.asyncio
-async def test_goodbye_phrase():
-    # Setup mocks
-    bot = MagicMock()
-    session_service = MagicMock(spec=SessionService)
-    lily_core_service = MagicMock(spec=LilyCoreService)
+async def test_goodbye_phrase(controller_bundle):
+    controller, session_service, lily_core_service = controller_bundle
     
     lily_core_service.send_chat_message = AsyncMock(return_value="Goodbye!")
     
-    controller = MessageController(bot, session_service, lily_core_service)
-    
     # Mock session service
     session_service.is_wake_phrase.return_value = False
     session_service.is_goodbye_phrase.return_value = True
@@ -131,3 +133,20 @@ async def test_goodbye_phrase():
     
     # Verify channel.send was called
     message.channel.send.assert_called_once_with("Goodbye!")
+
+
+async def test_evicted_session_user_is_notified(controller_bundle):
+    controller, session_service, _ = controller_bundle
+    
+    session = MagicMock()
+    session.user_id = "123"
+    session.channel.send = AsyncMock()
+    controller._user_sessions["123"] = session.channel
+    
+    # SessionService calls this synchronously from create_session
+    session_service.on_evict(session)
+    await asyncio.gather(*controller._notices)
+    
+    session.channel.send.assert_awaited_once()
+    assert "Hey Lily" in session.channel.send.await_args.args[0]
+    assert "123" not in controller._user_sessions
@@ -0,0 +1,28 @@
+from utils.message_utils import split_message
+
+
+def test_split_message_short_text():
+    assert split_message("hello", max_length=10) == ["hello"]
+
+
+def test_split_message_prefers_newlines():
+    text = "first line\nsecond line\nthird"
+
+    assert split_message(text, max_length=15) == ["first line", "second line", "third"]
+
+
+def test_split_message_hard_split_without_newline():
+    assert split_message("abcdefghij", max_length=4) == ["abcd", "efgh", "ij"]
+
+
+def test_split_message_never_emits_empty_chunks():
+    assert split_message("\nabcdef", max_length=4) == ["abcd", "ef"]
+
+
+def test_split_message_keeps_code_blocks_together():
+    text = "intro text\n```\nline one\nline two\n```\noutro"
+
+    chunks = split_message(text, max_length=30)
+
+    assert chunks[0] == "intro text"
+    assert chunks[1].startswith("```") and chunks[1].endswith("```")
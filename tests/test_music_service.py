@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from services import music_service
+from services.music_service import MusicService
+
+URL = "https://www.youtube.com/watch?v=abc123"
+
+
+@pytest.fixture
+def service():
+    service = MusicService()
+    yield service
+    service._ytdl_pool.shutdown(wait=False)
+
+
+async def test_extract_runs_one_extraction_per_url(service, monkeypatch):
+    active = peak = calls = 0
+    late_callers = []
+
+    async def fake_extract_info(url, *, loop=None, executor=None):
+        nonlocal active, peak, calls
+        calls += 1
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if calls == 1:
+            # Arrives while the second caller is still queued on the lock
+            late_callers.append(asyncio.create_task(service.extract(URL)))
+            raise RuntimeError("extraction failed")
+        return {"url": "https://stream.example/audio", "title": "Song"}
+
+    monkeypatch.setattr(music_service, "extract_info", fake_extract_info)
+
+    first = asyncio.create_task(service.extract(URL))
+    second = asyncio.create_task(service.extract(URL))
+    with pytest.raises(RuntimeError):
+        await first
+    results = await asyncio.gather(second, *late_callers)
+
+    assert peak == 1
+    assert calls == 2
+    assert all(data["title"] == "Song" for data in results)
+    assert service._meta_locks == {}
+    assert service._meta_lock_users == {}
@@ -0,0 +1,93 @@
+from services.session_service import SessionConfig, SessionService
+
+
+def test_wake_phrase_detection():
+    session_service = SessionService()
+
+    assert session_service.is_wake_phrase("Hey Lily, how are you?")
+    assert session_service.is_wake_phrase("HEY LILY")
+    assert not session_service.is_wake_phrase("hey")
+    assert not session_service.is_wake_phrase("well hey lily")
+
+
+def test_extract_message_after_wake():
+    session_service = SessionService()
+
+    assert session_service.extract_message_after_wake("Hey Lily, how are you?") == "how are you?"
+    assert session_service.extract_message_after_wake("hey lily") == ""
+    assert session_service.extract_message_after_wake("hello") == ""
+
+
+def test_goodbye_phrase_detection():
+    session_service = SessionService()
+
+    assert session_service.is_goodbye_phrase("Goodbye Lily")
+    assert not session_service.is_goodbye_phrase("goodbye lily, see you")
+
+
+def test_phrases_only_accept_ascii_case_variants():
+    session_service = SessionService()
+
+    for wake in ("hey lily", "Hey Lily", "HEY LILY", "hEy LiLy"):
+        assert session_service.is_wake_phrase(wake)
+        assert session_service.extract_message_after_wake(wake + "! hi") == "hi"
+    for goodbye in ("goodbye lily", "Goodbye Lily", "GOODBYE LILY"):
+        assert session_service.is_goodbye_phrase(goodbye)
+
+    # Unicode case folding would treat these look-alikes as "lily"
+    for lookalike in ("lıly", "lİly"):
+        assert not session_service.is_wake_phrase("hey " + lookalike)
+        assert session_service.extract_message_after_wake("hey " + lookalike + " hi") == ""
+        assert not session_service.is_goodbye_phrase("goodbye " + lookalike)
+
+
+def test_session_lookup_normalizes_user_id():
+    session_service = SessionService()
+
+    session_service.create_session("123", "alice", channel=None)
+
+    assert session_service.is_session_active(123)
+    assert session_service.end_session(123)
+    assert not session_service.is_session_active("123")
+
+
+def test_create_session_evicts_least_recently_used():
+    evicted = []
+    session_service = SessionService(SessionConfig(max_sessions=2), on_evict=evicted.append)
+
+    alice = session_service.create_session("1", "alice", channel=None)
+    session_service.create_session("2", "bob", channel=None)
+    session_service.create_session("3", "carol", channel=None)
+
+    assert evicted == [alice]
+    assert not alice.active
+    assert session_service.get_session("1") is None
+    assert session_service.get_session("2") is not None
+    assert session_service.get_session("3") is not None
+
+
+def test_session_access_refreshes_eviction_order():
+    evicted = []
+    session_service = SessionService(SessionConfig(max_sessions=2), on_evict=evicted.append)
+
+    session_service.create_session("1", "alice", channel=None)
+    session_service.create_session("2", "bob", channel=None)
+    # Touching alice makes bob the least recently used
+    assert session_service.is_session_active("1")
+    session_service.create_session("3", "carol", channel=None)
+    session_service.get_session("1")
+    session_service.create_session("4", "dave", channel=None)
+
+    assert [session.username for session in evicted] == ["bob", "carol"]
+    assert session_service.get_session("1") is not None
+
+
+def test_recreating_a_session_does_not_evict():
+    evicted = []
+    session_service = SessionService(SessionConfig(max_sessions=2), on_evict=evicted.append)
+
+    session_service.create_session("1", "alice", channel=None)
+    session_service.create_session("2", "bob", channel=None)
+    session_service.create_session("1", "alice", channel=None)
+
+    assert evicted == []
@@ -3,46 +3,110 @@ Message Utilities
 Helper functions for message formatting and splitting
 """
 
+import asyncio
+import bisect
 import logging
+import re
+import weakref
+from typing import Iterator
 
 logger = logging.getLogger("lily-discord-adapter")
 
 MAX_MESSAGE_LENGTH = 2000  # Discord's message limit
 
+# A complete ``` code block, so splits can avoid landing inside one
+_CODE_FENCE_RE = re.compile(r"```.*?```", re.DOTALL)
 
-def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> list:
+# Channel id -> lock held while a reply's chunks are sent; entries vanish once unused
+_channel_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _get_channel_lock(channel) -> asyncio.Lock:
+    """Get the send lock for a channel, creating it if needed"""
+    key = getattr(channel, "id", None) or id(channel)
+    lock = _channel_locks.get(key)
+    if lock is None:
+        lock = _channel_locks[key] = asyncio.Lock()
+    return lock
+
+
+def iter_message_chunks(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> Iterator[str]:
     """
-    Split a long message into multiple chunks that fit within Discord's limit.
+    Yield chunks of a message that fit within Discord's limit.
+    Splits prefer newlines and avoid landing inside ``` code blocks.
     
     Args:
         text: The text to split
         max_length: Maximum length of each chunk (default: 2000 for Discord)
     
-    Returns:
-        List of message chunks
+    Yields:
+        Message chunks, in order
     """
     if len(text) <= max_length:
-        return [text]
+        # The common case: one chunk, nothing to allocate
+        yield text
+        return
+    
+    start = 0
+    end_of_text = len(text)
     
-    chunks = []
-    remaining = text
+    # Code block spans, found once; fence_starts is sorted for bisect
+    fences = [m.span() for m in _CODE_FENCE_RE.finditer(text)] if "```" in text else []
+    fence_starts = [fence_start for fence_start, _ in fences]
     
-    while remaining:
-        if len(remaining) <= max_length:
-            chunks.append(remaining)
-            break
+    # Walk a cursor through text so only the emitted chunks are copied
+    while start < end_of_text:
+        end = start + max_length
+        if end >= end_of_text:
+            yield text[start:]
+            return
         
         # Try to split at a newline for cleaner breaks
-        split_pos = remaining.rfind('\n', 0, max_length)
+        split_pos = text.rfind('\n', start, end)
         if split_pos == -1:
             # No newline found, split at max_length
-            split_pos = max_length
+            split_pos = end
+        
+        if fences:
+            # Break before a code block rather than inside it, unless the block
+            # itself starts the chunk (it is then too long to keep whole)
+            k = bisect.bisect_left(fence_starts, split_pos) - 1
+            if k >= 0:
+                fence_start, fence_end = fences[k]
+                if start < fence_start < split_pos < fence_end:
+                    split_pos = fence_start
+                    if text[split_pos - 1] == '\n':
+                        split_pos -= 1
         
-        chunk = remaining[:split_pos]
-        chunks.append(chunk)
-        remaining = remaining[split_pos:].lstrip('\n')
+        if split_pos > start:
+            yield text[start:split_pos]
+        start = split_pos
+        while start < end_of_text and text[start] == '\n':
+            start += 1
+
+
+def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> list:
+    """
+    Split a long message into multiple chunks that fit within Discord's limit.
     
-    return chunks
+    Args:
+        text: The text to split
+        max_length: Maximum length of each chunk (default: 2000 for Discord)
+    
+    Returns:
+        List of message chunks
+    """
+    return list(iter_message_chunks(text, max_length))
+
+
+def _format_chunks(chunks: Iterator[str], prefix: str) -> Iterator[str]:
+    """Add prefix to the first chunk and a continuation marker to the rest"""
+    if not prefix:
+        yield from chunks
+        return
+    yield f"{prefix} {next(chunks)}"
+    for chunk in chunks:
+        yield f"...{chunk}"
 
 
 async def send_message(channel, text: str, prefix: str = "**Lily:**"):
@@ -57,19 +121,18 @@ async def send_message(channel, text: str, prefix: str = "**Lily:**"):
     Returns:
         True if all chunks sent successfully, False otherwise
     """
-    chunks = split_message(text)
+    messages = _format_chunks(iter_message_chunks(text), prefix)
     
-    for i, chunk in enumerate(chunks):
+    # Chunks must arrive in order, so they are sent one after another; the
+    # channel lock keeps concurrent replies from interleaving with them
+    async with _get_channel_lock(channel):
+        return await _send_chunks(channel, messages)
+
+
+async def _send_chunks(channel, messages: Iterator[str]) -> bool:
+    """Send formatted chunks in order, stopping at the first failure"""
+    for i, message in enumerate(messages):
         try:
-            if prefix:
-                # Add prefix to first chunk, continuation to others
-                if i == 0:
-                    message = f"{prefix} {chunk}"
-                else:
-                    message = f"...{chunk}"
-            else:
-                message = chunk
-            
             await channel.send(message)
         except Exception as e:
             logger.error(f"Error sending message chunk {i}: {e}")
@@ -2,15 +2,58 @@ import os
 import socket
 import logging
 import uuid
-import requests
+import random
 import time
-import threading
-from typing import List, Optional, Dict
+import asyncio
+from typing import List, NamedTuple, Optional, Dict, Tuple
+
+import aiohttp
+import orjson
 
 # Configure simplified logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("service-discovery")
 
+# Registration retry backoff (decorrelated jitter)
+REGISTRATION_RETRY_BASE = 5.0
+REGISTRATION_RETRY_MAX = 60.0
+_retry_random = random.SystemRandom()
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Timeouts for Consul calls made from the event loop
+DISCOVERY_TIMEOUT = aiohttp.ClientTimeout(total=5)
+DEREGISTER_TIMEOUT = aiohttp.ClientTimeout(total=2)
+# How long a successful discovery result is reused before asking Consul again
+DISCOVERY_CACHE_TTL = float(os.getenv("CONSUL_DISCOVERY_CACHE_TTL", "10"))
+
+
+def _consul_base_url(consul_host: str) -> str:
+    """Normalize a CONSUL_HTTP_ADDR value (host:port or URL) to a base URL."""
+    if "://" not in consul_host:
+        return f"http://{consul_host}"
+    return consul_host
+
+
+def _hostname_from_tags(tags) -> Optional[str]:
+    """Return the value of the first hostname=<host> tag, if any."""
+    for tag in tags:
+        key, sep, value = tag.partition("=")
+        if sep and key == "hostname":
+            return value
+    return None
+
+
+class ServiceInfo(NamedTuple):
+    """A discovered service instance."""
+    id: Optional[str]
+    name: Optional[str]
+    address: Optional[str]
+    port: Optional[int]
+    tags: Tuple[str, ...]
+    hostname: Optional[str]
+    health: str
+
 
 class ServiceDiscovery:
     """Consul-based service discovery for microservices."""
@@ -26,11 +69,7 @@ class ServiceDiscovery:
             tags: List of tags (e.g., ['discord', 'adapter'])
         """
         self.consul_host = os.getenv("CONSUL_HTTP_ADDR", "consul:8500")
-        # Ensure we have a clean host/port for requests
-        if "://" not in self.consul_host:
-            self.consul_url = f"http://{self.consul_host}"
-        else:
-            self.consul_url = self.consul_host
+        self.consul_url = _consul_base_url(self.consul_host)
 
         self.service_name = service_name
         self.port = port
@@ -47,11 +86,30 @@ class ServiceDiscovery:
             hostname = f"{service_name}.{domain_name}"
             self.tags.append(f"hostname={hostname}")
 
-        # Registration thread control
-        self._stop_event = threading.Event()
-        self._registration_thread = None
-
-    def register(self):
+        # Registration task control
+        self._stop_event = asyncio.Event()
+        self._registration_task: Optional[asyncio.Task] = None
+
+        # Reused aiohttp session (keep-alive to the Consul agent), created on
+        # first use so it binds to the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        # service_name -> (monotonic fetch time, services); only touched from the event loop
+        self._services_cache: Dict[Optional[str], tuple] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared discovery session, creating it if needed."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=DISCOVERY_TIMEOUT)
+        return self._session
+
+    async def close(self):
+        """Stop the registration task and close the HTTP session."""
+        await self._stop_registration()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def register(self):
         """
         Register service with Consul.
         If it fails, it will NOT retry automatically here. Use start() for robust behavior.
@@ -76,48 +134,71 @@ class ServiceDiscovery:
         }
 
         try:
-            logger.info(f"Attempting to register {self.service_name} ({self.service_id}) with Consul at {self.consul_url}...")
-            response = requests.put(url, json=payload, timeout=5)
-            response.raise_for_status()
-            logger.info(f"Successfully registered {self.service_name} with Consul.")
+            logger.info("Attempting to register %s (%s) with Consul at %s...", self.service_name, self.service_id, self.consul_url)
+            async with self._get_session().put(url, data=orjson.dumps(payload), headers=JSON_HEADERS) as response:
+                response.raise_for_status()
+            logger.info("Successfully registered %s with Consul.", self.service_name)
             return True
         except Exception as e:
-            logger.error(f"Failed to register with Consul: {e}")
+            logger.error("Failed to register with Consul: %s", e)
             return False
 
-    def deregister(self):
+    async def deregister(self):
         """Deregister the service."""
-        if self._registration_thread and self._registration_thread.is_alive():
-            self._stop_event.set()
-            self._registration_thread.join(timeout=1.0)
+        await self._stop_registration()
 
+        self._services_cache.clear()
         url = f"{self.consul_url}/v1/agent/service/deregister/{self.service_id}"
         try:
-            requests.put(url, timeout=2)
-            logger.info(f"Deregistered {self.service_name}.")
+            async with self._get_session().put(url, timeout=DEREGISTER_TIMEOUT):
+                pass
+            logger.info("Deregistered %s.", self.service_name)
         except Exception as e:
-            logger.error(f"Failed to deregister: {e}")
+            logger.error("Failed to deregister: %s", e)
 
-    def start(self):
-        """Start a background thread to ensure registration succeeds (retry logic)."""
+    async def start(self):
+        """Start a background task to ensure registration succeeds (retry logic)."""
         self._stop_event.clear()
-        self._registration_thread = threading.Thread(target=self._maintain_registration, daemon=True)
-        self._registration_thread.start()
+        self._registration_task = asyncio.create_task(self._maintain_registration())
 
-    def _maintain_registration(self):
+    async def _stop_registration(self):
+        """Signal the registration task to stop and wait for it."""
+        task, self._registration_task = self._registration_task, None
+        if task and not task.done():
+            self._stop_event.set()
+            try:
+                await asyncio.wait_for(task, timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # Only swallow the registration task's own cancellation, not ours
+                if asyncio.current_task().cancelling():
+                    raise
+
+    async def _maintain_registration(self):
         """Retry registration until success, then monitor."""
+        delay = REGISTRATION_RETRY_BASE
         while not self._stop_event.is_set():
-            if self.register():
+            if await self.register():
                 # If success, we are good. Consul will Health Check us.
                 break
 
-            # Wait before retrying
-            logger.info("Retrying registration in 5 seconds...")
-            self._stop_event.wait(5.0)
+            # Back off with jitter so restarted instances don't retry in lockstep
+            delay = min(REGISTRATION_RETRY_MAX, _retry_random.uniform(REGISTRATION_RETRY_BASE, delay * 3))
+            logger.info("Retrying registration in %.1f seconds...", delay)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
 
     # ==================== SERVICE DISCOVERY METHODS ====================
 
-    def get_services(self, service_name: Optional[str] = None) -> List[Dict]:
+    def invalidate(self, service_name: Optional[str] = None):
+        """Drop cached lookups for a service (and the all-services list that includes it)."""
+        self._services_cache.pop(service_name, None)
+        self._services_cache.pop(None, None)
+
+    async def get_services(self, service_name: Optional[str] = None) -> List[ServiceInfo]:
         """
         Get all registered services or filter by service name.
 
@@ -125,8 +206,12 @@ class ServiceDiscovery:
             service_name: Optional filter for specific service
 
         Returns:
-            List of service dictionaries with address, port, health status
+            List of ServiceInfo tuples with address, port, health status
         """
+        cached = self._services_cache.get(service_name)
+        if cached and time.monotonic() - cached[0] < DISCOVERY_CACHE_TTL:
+            return cached[1]
+
         url = f"{self.consul_url}/v1/health/service"
         if service_name:
             url = f"{url}/{service_name}?passing=true"
@@ -134,9 +219,9 @@ class ServiceDiscovery:
             url = f"{url}?passing=true"
 
         try:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            services = response.json()
+            async with self._get_session().get(url) as response:
+                response.raise_for_status()
+                services = orjson.loads(await response.read())
 
             result = []
             for svc in services:
@@ -150,23 +235,29 @@ class ServiceDiscovery:
                         health = "critical"
                         break
 
-                result.append({
-                    "id": service_info.get("ID"),
-                    "name": service_info.get("Service"),
-                    "address": service_info.get("Address"),
-                    "port": service_info.get("Port"),
-                    "tags": service_info.get("Tags", []),
-                    "health": health
-                })
-
-            logger.debug(f"Discovered {len(result)} services")
+                tags = tuple(service_info.get("Tags") or ())
+                # Parsed once here so URL lookups don't rescan the tags
+                hostname = _hostname_from_tags(tags)
+
+                result.append(ServiceInfo(
+                    id=service_info.get("ID"),
+                    name=service_info.get("Service"),
+                    address=service_info.get("Address"),
+                    port=service_info.get("Port"),
+                    tags=tags,
+                    hostname=hostname,
+                    health=health
+                ))
+
+            logger.debug("Discovered %d services", len(result))
+            self._services_cache[service_name] = (time.monotonic(), result)
             return result
 
         except Exception as e:
-            logger.error(f"Failed to discover services: {e}")
+            logger.error("Failed to discover services: %s", e)
             return []
 
-    def get_service_url(self, service_name: str, protocol: str = "http") -> Optional[str]:
+    async def get_service_url(self, service_name: str, protocol: str = "http") -> Optional[str]:
         """
         Get the URL for a service based on protocol.
 
@@ -177,17 +268,10 @@ class ServiceDiscovery:
         Returns:
             URL string (e.g., https://hostname/api or wss://hostname/ws)
         """
-        services = self.get_services(service_name)
+        services = await self.get_services(service_name)
         
         if services:
-            svc = services[0]
-            hostname = None
-            
-            # Extract hostname from tags
-            for tag in svc.get('tags', []):
-                if tag.startswith('hostname='):
-                    hostname = tag.split('=', 1)[1]
-                    break
+            hostname = services[0].hostname
             
             if hostname:
                 # Always use HTTPS/WSS for secure communication
@@ -204,18 +288,18 @@ class ServiceDiscovery:
             
         return None
 
-    def discover_all_services(self) -> Dict[str, List[Dict]]:
+    async def discover_all_services(self) -> Dict[str, List[ServiceInfo]]:
         """
         Discover all registered services grouped by name.
 
         Returns:
             Dictionary with service names as keys and lists of service instances as values
         """
-        all_services = self.get_services()
+        all_services = await self.get_services()
         grouped = {}
 
         for svc in all_services:
-            name = svc["name"]
+            name = svc.name
             if name not in grouped:
                 grouped[name] = []
             grouped[name].append(svc)